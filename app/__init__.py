@@ -2,7 +2,7 @@
 import os
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
+from flask_login import LoginManager, login_required
 from flask_cors import CORS
 from flask_migrate import Migrate
 from app.config import Config
@@ -38,7 +38,8 @@ def create_app(config_class=Config):
     CORS(
         app,
         origins=origins,
-        supports_credentials=True
+        supports_credentials=True,
+        expose_headers=['X-DB-Query-Count', 'X-DB-Time-Ms']
     )
 
     # ---- Extensions
@@ -46,6 +47,18 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     login.init_app(app)
 
+    # ---- OCR text compression settings
+    from app.utils.compression import init_compression
+    init_compression(app)
+
+    # ---- Per-request query count / DB time headers
+    from app.utils.db_utils import init_query_stats
+    init_query_stats(app)
+
+    # ---- OCR worker memory governor
+    from app.utils.memory import governor
+    governor.init_app(app)
+
     # ---- Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -66,6 +79,11 @@ def create_app(config_class=Config):
     def test_api():
         return jsonify({'message': 'API is working!'}), 200
 
+    @app.route('/api/metrics/memory', methods=['GET'])
+    @login_required
+    def memory_metrics():
+        return jsonify(governor.stats()), 200
+
     @app.route('/', methods=['GET'])
     def index():
         return jsonify({
@@ -87,6 +105,8 @@ def create_app(config_class=Config):
                 'ocr': [
                     {'endpoint': '/api/ocr',            'method': 'POST',
                         'description': 'Process file with OCR'},
+                    {'endpoint': '/api/ocr/batch',      'method': 'POST',
+                        'description': 'Process several files with OCR'},
                     {'endpoint': '/api/results',        'method': 'GET',
                         'description': 'Get all OCR results'},
                     {'endpoint': '/api/results/:id',    'method': 'GET',
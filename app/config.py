@@ -16,6 +16,37 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Engine / connection pool tuning (override via Render env vars).
+    # SQLite keeps its default pool, so only pre-ping/recycle apply there.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'True') == 'True',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    if not db_url.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        })
+
+    # Seconds to cache user lookups done by the login user_loader (0 disables)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+
+    # Expose per-request query count / DB time as response headers
+    DB_QUERY_STATS = os.environ.get('DB_QUERY_STATS', 'True') == 'True'
+
+    # Stored OCR text: 'zlib' or 'zstd' (needs the optional `zstandard` package),
+    # applied to texts of at least TEXT_COMPRESSION_THRESHOLD UTF-8 bytes
+    TEXT_COMPRESSION = os.environ.get('TEXT_COMPRESSION', 'zlib')
+    TEXT_COMPRESSION_THRESHOLD = int(os.environ.get('TEXT_COMPRESSION_THRESHOLD', 1024))
+
+    # OCR worker memory governor (Render free tier is killed at 512MB).
+    # The soft limit must sit above RSS with the EasyOCR model loaded (see the
+    # load_model stage in /api/metrics/memory) or jobs will be refused.
+    MEMORY_SOFT_LIMIT_MB = int(os.environ.get('MEMORY_SOFT_LIMIT_MB', 450))
+    MEMORY_HARD_LIMIT_MB = int(os.environ.get('MEMORY_HARD_LIMIT_MB', 480))
+    OCR_QUEUE_TIMEOUT = int(os.environ.get('OCR_QUEUE_TIMEOUT', 30))
+
     # File upload settings
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads')
@@ -2,14 +2,19 @@ import os
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from app.models.user import OCRResult
+from sqlalchemy.orm import undefer
+from app.models.user import OCRResult, bulk_insert_ocr_results
 from app import db
-from app.utils.ocr_utils import process_file
+from app.utils.ocr_utils import process_file, inspect_upload, UploadRejected, MAX_JOB_PIXELS
+from app.utils.memory import governor, MemoryPressure
 
 api_bp = Blueprint('api', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 MAX_FILE_SIZE_MB = 5  # prevent huge uploads on Render free tier
+MAX_BATCH_FILES = 10
+MAX_BATCH_PAGES = 20  # total pages across all files of a batch request
+RETRY_AFTER_SECONDS = 30  # sent with 503s when the memory governor refuses work
 
 # ✅ Load EasyOCR reader via utils
 # reader handled in ocr_utils.py
@@ -19,6 +24,49 @@ def allowed_file(filename, allowed_exts):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_exts
 
 
+def validate_upload(file):
+    """Validate an upload before it is saved.
+
+    Returns (error, info): error is a message for an unacceptable upload,
+    else None, and info is the pre-flight {'pages', 'pixels'} estimate.
+    """
+    if file.filename == '':
+        return 'No file selected', None
+
+    if not allowed_file(file.filename, ALLOWED_EXTENSIONS):
+        return 'File type not allowed', None
+
+    # ✅ File size check
+    file.seek(0, os.SEEK_END)
+    file_size_mb = file.tell() / (1024 * 1024)
+    file.seek(0)
+    if file_size_mb > MAX_FILE_SIZE_MB:
+        return f'File too large (>{MAX_FILE_SIZE_MB} MB)', None
+
+    # ✅ Header / page-tree inspection (no decoding or rasterization)
+    try:
+        info = inspect_upload(file.stream, file.filename.rsplit('.', 1)[1].lower())
+    except UploadRejected as e:
+        return str(e), None
+
+    return None, info
+
+
+def save_upload(file):
+    """Save an uploaded file to UPLOAD_FOLDER and return (filename, path)."""
+    filename = secure_filename(file.filename)
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    file.save(file_path)
+    return filename, file_path
+
+
+def memory_pressure_response(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response, 503
+
+
 @api_bp.route('/user', methods=['GET'])
 @login_required
 def get_current_user():
@@ -38,28 +86,17 @@ def ocr_process():
         return jsonify({'error': 'No file part'}), 400
 
     file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-
-    if not allowed_file(file.filename, ALLOWED_EXTENSIONS):
-        return jsonify({'error': 'File type not allowed'}), 400
-
-    # ✅ File size check
-    file.seek(0, os.SEEK_END)
-    file_size_mb = file.tell() / (1024 * 1024)
-    file.seek(0)
-    if file_size_mb > MAX_FILE_SIZE_MB:
-        return jsonify({'error': f'File too large (>{MAX_FILE_SIZE_MB} MB)'}), 400
+    error, info = validate_upload(file)
+    if error:
+        return jsonify({'error': error}), 400
 
     # Save file
-    filename = secure_filename(file.filename)
-    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    filename, file_path = save_upload(file)
 
     try:
-        # ✅ OCR with shared utility (supports PDF & Image)
-        extracted_text = process_file(file_path)
+        # ✅ OCR with shared utility (supports PDF & Image), admitted by the memory governor
+        with governor.job():
+            extracted_text = process_file(file_path)
 
         # Save in DB
         ocr_result = OCRResult(
@@ -75,9 +112,73 @@ def ocr_process():
             'success': True,
             'filename': filename,
             'text': extracted_text,
-            'result_id': ocr_result.id
+            'result_id': ocr_result.id,
+            'pages': info['pages']
         })
 
+    except MemoryPressure as e:
+        return memory_pressure_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'OCR failed: {str(e)}'}), 500
+
+
+@api_bp.route('/ocr/batch', methods=['POST'])
+@login_required
+def ocr_process_batch():
+    """Run OCR on several files and store all results in one bulk insert."""
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({'error': 'No file part'}), 400
+
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({'error': f'Too many files (>{MAX_BATCH_FILES})'}), 400
+
+    total_pages = 0
+    total_pixels = 0
+    for file in files:
+        error, info = validate_upload(file)
+        if error:
+            return jsonify({'error': f'{file.filename}: {error}'}), 400
+        total_pages += info['pages']
+        total_pixels += info['pixels']
+
+    if total_pages > MAX_BATCH_PAGES:
+        return jsonify({'error': f'Too many pages in batch ({total_pages} > {MAX_BATCH_PAGES})'}), 400
+
+    # The whole batch runs as one OCR job, so it shares the single-job budget
+    if total_pixels > MAX_JOB_PIXELS:
+        return jsonify({'error': f'Batch too large to OCR ({total_pixels // 1_000_000} MP > '
+                                 f'{MAX_JOB_PIXELS // 1_000_000} MP)'}), 400
+
+    rows = []
+    try:
+        with governor.job():
+            for file in files:
+                filename, file_path = save_upload(file)
+                rows.append({
+                    'filename': filename,
+                    'file_path': file_path,
+                    'text_content': process_file(file_path),
+                    'user_id': current_user.id
+                })
+
+        result_ids = bulk_insert_ocr_results(rows)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'results': [
+                {
+                    'filename': row['filename'],
+                    'text': row['text_content'],
+                    'result_id': result_id
+                } for row, result_id in zip(rows, result_ids)
+            ]
+        })
+
+    except MemoryPressure as e:
+        return memory_pressure_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'OCR failed: {str(e)}'}), 500
@@ -94,7 +195,7 @@ def get_user_results():
                 'id': r.id,
                 'filename': r.filename,
                 'timestamp': r.timestamp.isoformat(),
-                'text_preview': (r.text_content[:100] + '...') if len(r.text_content) > 100 else r.text_content
+                'text_preview': r.text_preview or ''
             } for r in results
         ]
     })
@@ -103,8 +204,12 @@ def get_user_results():
 @api_bp.route('/results/<int:result_id>', methods=['GET'])
 @login_required
 def get_result(result_id):
-    result = OCRResult.query.filter_by(
-        id=result_id, user_id=current_user.id).first_or_404()
+    # Full text is deferred elsewhere; load it in the same SELECT here
+    try:
+        result = OCRResult.query.options(undefer(OCRResult.text_content)).filter_by(
+            id=result_id, user_id=current_user.id).first_or_404()
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 500
     return jsonify({
         'id': result.id,
         'filename': result.filename,
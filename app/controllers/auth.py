@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_user, logout_user, current_user, login_required
-from app.models.user import User
+from app.models.user import User, invalidate_user_cache
 from app import db
 
 auth_bp = Blueprint('auth', __name__)
@@ -37,6 +37,7 @@ def api_login():
 @auth_bp.route('/api/logout', methods=['POST'])
 @login_required
 def api_logout():
+    invalidate_user_cache(current_user.id)
     logout_user()
     return jsonify({"success": True})
 
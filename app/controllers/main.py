@@ -26,6 +26,8 @@ def index():
             'ocr': [
                 {'endpoint': '/api/ocr', 'method': 'POST',
                     'description': 'Process file with OCR'},
+                {'endpoint': '/api/ocr/batch', 'method': 'POST',
+                    'description': 'Process several files with OCR'},
                 {'endpoint': '/api/results', 'method': 'GET',
                     'description': 'Get all OCR results'},
                 {'endpoint': '/api/results/:id', 'method': 'GET',
@@ -1,7 +1,22 @@
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy import insert
+from sqlalchemy.orm import deferred, make_transient_to_detached, validates
 from datetime import datetime
+import threading
+import time
 from app import db, login
+from app.utils.compression import CompressedText
+
+TEXT_PREVIEW_LENGTH = 100
+
+
+def make_text_preview(text):
+    """Short listing preview of OCR text, stored alongside the full text."""
+    if text is None:
+        return None
+    return (text[:TEXT_PREVIEW_LENGTH] + '...') if len(text) > TEXT_PREVIEW_LENGTH else text
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -24,14 +39,77 @@ class OCRResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(140))
     file_path = db.Column(db.String(256))
-    text_content = db.Column(db.Text)
+    # Deferred: only loaded (and decompressed) when the full text is accessed
+    text_content = deferred(db.Column(CompressedText))
+    text_preview = db.Column(db.String(TEXT_PREVIEW_LENGTH + 3))
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     
     def __repr__(self):
         return f'<OCRResult {self.filename}>'
 
+    @validates('text_content')
+    def _sync_text_preview(self, key, text):
+        self.text_preview = make_text_preview(text)
+        return text
+
+
+def bulk_insert_ocr_results(rows):
+    """Insert many OCR results in one executemany round trip.
+
+    ``rows`` is a list of dicts keyed by OCRResult column names. Returns the
+    new primary keys in insertion order. The caller is responsible for commit.
+    """
+    if not rows:
+        return []
+    for row in rows:
+        row.setdefault('text_preview', make_text_preview(row.get('text_content')))
+    return list(db.session.scalars(
+        insert(OCRResult).returning(OCRResult.id, sort_by_parameter_order=True),
+        rows
+    ))
+
+
+# ---- Short-TTL cache for the login user_loader
+# Only plain column values are cached; each request gets its own instance
+# merged into the current session without a SELECT. password_hash is left
+# out and lazy-loads if ever accessed on a cached user.
+_USER_CACHE_COLUMNS = ('id', 'username', 'email')
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+
+def invalidate_user_cache(user_id=None):
+    """Drop one cached user, or the whole cache if no id is given."""
+    with _user_cache_lock:
+        if user_id is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(int(user_id), None)
+
 
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id)) 
\ No newline at end of file
+    user_id = int(id)
+    ttl = current_app.config.get('USER_CACHE_TTL', 0)
+    if ttl <= 0:
+        return db.session.get(User, user_id)
+
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+    if entry and entry[0] > now:
+        user = User(**entry[1])
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    with _user_cache_lock:
+        if user is None:
+            _user_cache.pop(user_id, None)
+        else:
+            _user_cache[user_id] = (
+                now + ttl,
+                {c: getattr(user, c) for c in _USER_CACHE_COLUMNS}
+            )
+    return user 
\ No newline at end of file
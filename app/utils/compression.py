@@ -0,0 +1,89 @@
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+# Stored values carry a one-byte header so rows written with different
+# settings (or before compression was enabled) can always be read back.
+_RAW = b'\x00'
+_ZLIB = b'\x01'
+_ZSTD = b'\x02'
+
+# Resolved once at startup by init_compression() from TEXT_COMPRESSION /
+# TEXT_COMPRESSION_THRESHOLD in Config.
+_threshold_bytes = 1024
+_zstandard = None  # the zstandard module, only when 'zstd' is configured and importable
+
+
+def init_compression(app):
+    """Resolve the configured algorithm once at startup.
+
+    An unknown TEXT_COMPRESSION value, or 'zstd' without the zstandard
+    package, logs a warning and falls back to zlib, so writes never fail
+    during a DB flush after OCR has already run.
+    """
+    global _threshold_bytes, _zstandard
+    _threshold_bytes = app.config.get('TEXT_COMPRESSION_THRESHOLD', _threshold_bytes)
+    algorithm = app.config.get('TEXT_COMPRESSION', 'zlib').lower()
+
+    _zstandard = None
+    if algorithm == 'zstd':
+        try:
+            import zstandard
+            _zstandard = zstandard
+        except ImportError:
+            app.logger.warning(
+                "TEXT_COMPRESSION=zstd but 'zstandard' is not installed; using zlib")
+    elif algorithm != 'zlib':
+        app.logger.warning("Unknown TEXT_COMPRESSION %r; using zlib", algorithm)
+
+
+def compress_text(text):
+    """Encode text to the headered byte format, compressing large values."""
+    if text is None:
+        return None
+    data = text.encode('utf-8')
+    if len(data) < _threshold_bytes:
+        return _RAW + data
+
+    if _zstandard is not None:
+        # Compressor objects are not thread-safe, so create one per call
+        packed = _ZSTD + _zstandard.ZstdCompressor(level=10).compress(data)
+    else:
+        packed = _ZLIB + zlib.compress(data, 6)
+
+    # Already-dense text can grow when compressed; keep whichever is smaller
+    return packed if len(packed) < len(data) + 1 else _RAW + data
+
+
+def decompress_text(value):
+    """Decode a value produced by compress_text back to str."""
+    if value is None:
+        return None
+    value = bytes(value)
+    header, payload = value[:1], value[1:]
+    if header == _ZLIB:
+        payload = zlib.decompress(payload)
+    elif header == _ZSTD:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError(
+                "Stored text is zstd-compressed but the 'zstandard' package "
+                "is not installed") from e
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif header != _RAW:
+        raise ValueError('Unknown compressed text header')
+    return payload.decode('utf-8')
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored as (optionally compressed) bytes."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
@@ -0,0 +1,43 @@
+import time
+
+from flask import g, has_request_context
+from sqlalchemy import event
+
+# Per-request DB instrumentation. Counters live on flask.g so they reset with
+# every request and are reported back as response headers.
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    if has_request_context():
+        g.db_query_count = g.get('db_query_count', 0) + 1
+        g.db_query_time = g.get('db_query_time', 0.0) + elapsed
+
+
+def get_query_stats():
+    """Return (query_count, db_time_ms) for the current request."""
+    return g.get('db_query_count', 0), round(g.get('db_query_time', 0.0) * 1000, 2)
+
+
+def init_query_stats(app):
+    """Time queries on the app's engine and attach X-DB-Query-Count /
+    X-DB-Time-Ms headers to every response. No-op unless DB_QUERY_STATS."""
+    if not app.config.get('DB_QUERY_STATS'):
+        return
+
+    from app import db
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.after_request
+    def add_query_stats(response):
+        count, db_time_ms = get_query_stats()
+        response.headers['X-DB-Query-Count'] = str(count)
+        response.headers['X-DB-Time-Ms'] = str(db_time_ms)
+        return response
@@ -0,0 +1,180 @@
+import ctypes
+import gc
+import os
+import resource
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, request
+
+# Memory governor for the OCR worker. Render's free tier kills the process at
+# 512MB, so OCR jobs run one at a time per worker, RSS is tracked per stage,
+# caches are trimmed between jobs and a worker that stays above the hard
+# limit (or cannot get back under the soft limit to admit a job) is recycled
+# once its current response has been sent.
+
+
+class MemoryPressure(Exception):
+    """Raised when new OCR work is refused to protect the worker's memory."""
+
+
+def get_rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Non-Linux fallback: peak RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _malloc_trim():
+    """Return freed heap pages to the OS (glibc only)."""
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryGovernor:
+    def __init__(self, soft_limit_mb=450, hard_limit_mb=480, queue_timeout=30):
+        self.soft_limit_mb = soft_limit_mb
+        self.hard_limit_mb = hard_limit_mb
+        self.queue_timeout = queue_timeout
+        self.recycle_requested = False
+        self._job_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._release_hooks = []
+        self._stages = {}
+        self._events = {'jobs': 0, 'refused': 0, 'queue_timeouts': 0,
+                        'trims': 0, 'model_releases': 0, 'recycles': 0}
+        self._peak_rss_mb = 0.0
+
+    def init_app(self, app):
+        self.soft_limit_mb = app.config.get('MEMORY_SOFT_LIMIT_MB', self.soft_limit_mb)
+        self.hard_limit_mb = app.config.get('MEMORY_HARD_LIMIT_MB', self.hard_limit_mb)
+        self.queue_timeout = app.config.get('OCR_QUEUE_TIMEOUT', self.queue_timeout)
+
+        @app.after_request
+        def recycle_if_needed(response):
+            # Only gunicorn respawns a worker that exits on SIGTERM
+            if self.recycle_requested and \
+                    request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn'):
+                response.call_on_close(
+                    lambda: os.kill(os.getpid(), signal.SIGTERM))
+            return response
+
+    def register_release_hook(self, hook):
+        """Register a callable that frees a cached model under memory pressure.
+
+        The hook must return True if it released something, else False.
+        """
+        self._release_hooks.append(hook)
+
+    def _record_event(self, name):
+        with self._stats_lock:
+            self._events[name] += 1
+
+    def _observe(self, rss_mb):
+        with self._stats_lock:
+            self._peak_rss_mb = max(self._peak_rss_mb, rss_mb)
+
+    def trim(self, release_models=False):
+        """Run GC, drop torch/allocator caches and optionally cached models."""
+        if release_models:
+            for hook in self._release_hooks:
+                # Hooks return True only if they actually dropped a model
+                if hook():
+                    self._record_event('model_releases')
+        gc.collect()
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        _malloc_trim()
+        self._record_event('trims')
+        return get_rss_mb()
+
+    @contextmanager
+    def stage(self, name):
+        """Track RSS before/after a processing stage."""
+        before = get_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            after = get_rss_mb()
+            self._observe(after)
+            with self._stats_lock:
+                self._stages[name] = {
+                    'rss_before_mb': round(before, 1),
+                    'rss_after_mb': round(after, 1),
+                    'delta_mb': round(after - before, 1),
+                    'seconds': round(time.perf_counter() - start, 3)
+                }
+
+    @contextmanager
+    def job(self):
+        """Admit one OCR job, queueing behind a running one and refusing
+        new work while RSS stays above the soft limit."""
+        if not self._job_lock.acquire(timeout=self.queue_timeout):
+            self._record_event('queue_timeouts')
+            raise MemoryPressure('OCR worker is busy, please retry shortly')
+        try:
+            rss = get_rss_mb()
+            if rss > self.soft_limit_mb:
+                rss = self.trim(release_models=True)
+            if rss > self.soft_limit_mb:
+                self._record_event('refused')
+                current_app.logger.warning(
+                    'Refusing OCR job: RSS %.0fMB > soft limit %sMB', rss, self.soft_limit_mb)
+                # Freed memory is rarely returned to the OS, so a worker still
+                # above the soft limit would refuse every job; replace it
+                self._request_recycle(rss)
+                raise MemoryPressure('Server is low on memory, please retry shortly')
+
+            self._record_event('jobs')
+            try:
+                yield
+            finally:
+                self._after_job()
+        finally:
+            self._job_lock.release()
+
+    def _after_job(self):
+        # The cached model stays resident between jobs (the soft limit is
+        # expected to sit above RSS with it loaded); it is only released
+        # when the worker is near the hard limit.
+        rss = self.trim()
+        if rss > self.hard_limit_mb:
+            rss = self.trim(release_models=True)
+        self._observe(rss)
+        if rss > self.hard_limit_mb:
+            self._request_recycle(rss)
+
+    def _request_recycle(self, rss):
+        if self.recycle_requested:
+            return
+        self.recycle_requested = True
+        self._record_event('recycles')
+        current_app.logger.warning(
+            'RSS %.0fMB still high after trimming, recycling worker', rss)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'rss_mb': round(get_rss_mb(), 1),
+                'peak_rss_mb': round(self._peak_rss_mb, 1),
+                'soft_limit_mb': self.soft_limit_mb,
+                'hard_limit_mb': self.hard_limit_mb,
+                'recycle_requested': self.recycle_requested,
+                'events': dict(self._events),
+                'stages': dict(self._stages)
+            }
+
+
+governor = MemoryGovernor()
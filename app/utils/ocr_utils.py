@@ -1,29 +1,148 @@
 import os
 import tempfile
 import sys
-import gc
+import threading
+
+from app.utils.memory import governor
 
 # NOTE: Heavy libraries (easyocr, fitz, torch) are imported lazily inside functions
 # to prevent "Out of Memory" errors on Render Free Tier (512MB RAM) during startup.
+# Memory between jobs is managed by the governor in app/utils/memory.py.
+
+# Pre-flight limits, checked from file headers / the PDF page tree only
+PDF_RENDER_DPI = 200                # DPI used when rasterizing scanned PDFs
+MAX_IMAGE_PIXELS = 25_000_000       # per image or rendered PDF page (~5000x5000)
+MAX_PDF_PAGES = 20
+# Job cost estimate = total pixels OCR must process. A Letter page at 200 DPI
+# is 1700x2200 (~3.7 MP) and A4 ~3.9 MP, so this allows ~20 standard pages
+# and rejects shorter documents made of oversized pages.
+MAX_JOB_PIXELS = 80_000_000
+
+# Pillow reports phone JPEGs carrying multi-picture data (depth maps, HDR) as MPO
+IMAGE_FORMATS = {'png': {'PNG'}, 'jpg': {'JPEG', 'MPO'}, 'jpeg': {'JPEG', 'MPO'}}
+
+
+class UploadRejected(Exception):
+    """Raised when an upload fails pre-flight inspection."""
+
+
+def inspect_upload(stream, file_extension):
+    """Cheaply inspect an upload stream before it is saved or OCR'd.
+
+    Only image headers and the PDF page tree are read; nothing is decoded or
+    rasterized. Returns {'pages': int, 'pixels': int} where pixels is the
+    estimated amount of image data OCR would have to process. Raises
+    UploadRejected if the file is not what its extension claims or exceeds
+    the page/pixel budgets. The stream is rewound before returning.
+    """
+    try:
+        if file_extension == 'pdf':
+            info = _inspect_pdf(stream)
+        else:
+            info = _inspect_image(stream, IMAGE_FORMATS[file_extension])
+    finally:
+        stream.seek(0)
+
+    if info['pixels'] > MAX_JOB_PIXELS:
+        raise UploadRejected(
+            f'File too large to OCR ({info["pixels"] // 1_000_000} MP > '
+            f'{MAX_JOB_PIXELS // 1_000_000} MP)')
+    return info
+
+
+def _inspect_image(stream, expected_formats):
+    from PIL import Image
+
+    try:
+        # Image.open only parses the header; pixel data is decoded on load()
+        with Image.open(stream) as image:
+            image_format = image.format
+            width, height = image.size
+    except Image.DecompressionBombError as e:
+        raise UploadRejected('Image dimensions too large') from e
+    except Exception as e:
+        raise UploadRejected('File is not a valid image') from e
+
+    if image_format not in expected_formats:
+        raise UploadRejected('File content does not match its extension')
+    if width * height > MAX_IMAGE_PIXELS:
+        raise UploadRejected(
+            f'Image dimensions too large ({width}x{height})')
+    return {'pages': 1, 'pixels': width * height}
+
+
+def _inspect_pdf(stream):
+    import fitz  # PyMuPDF
+
+    data = stream.read()
+    if not data.startswith(b'%PDF'):
+        raise UploadRejected('File content does not match its extension')
+    try:
+        doc = fitz.open(stream=data, filetype='pdf')
+    except Exception as e:
+        raise UploadRejected('File is not a valid PDF') from e
+
+    try:
+        if doc.needs_pass:
+            raise UploadRejected('Encrypted PDFs are not supported')
+        if doc.page_count > MAX_PDF_PAGES:
+            raise UploadRejected(
+                f'Too many pages ({doc.page_count} > {MAX_PDF_PAGES})')
+
+        # Page sizes come from the page tree; nothing is rendered here
+        scale = PDF_RENDER_DPI / 72
+        pixels = 0
+        for page in doc:
+            page_pixels = int(page.rect.width * scale) * int(page.rect.height * scale)
+            if page_pixels > MAX_IMAGE_PIXELS:
+                raise UploadRejected(
+                    f'Page {page.number + 1} dimensions too large')
+            pixels += page_pixels
+        return {'pages': doc.page_count, 'pixels': pixels}
+    finally:
+        doc.close()
+
+_reader = None
+_reader_lock = threading.Lock()
+
 
 def get_ocr_reader():
-    """Initialize and return the EasyOCR reader. Lazily imports easyocr."""
-    import easyocr
-    return easyocr.Reader(['en'], gpu=False)
+    """Return the shared EasyOCR reader, loading it on first use.
+
+    The reader is kept between jobs to avoid reloading the model on every
+    request; the memory governor releases it when RSS is too high.
+    """
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            with governor.stage('load_model'):
+                import easyocr
+                _reader = easyocr.Reader(['en'], gpu=False)
+        return _reader
+
+
+def release_ocr_reader():
+    """Drop the shared reader so its memory can be reclaimed.
+
+    Returns True if a loaded reader was released.
+    """
+    global _reader
+    with _reader_lock:
+        released = _reader is not None
+        _reader = None
+    return released
+
+
+governor.register_release_hook(release_ocr_reader)
+
 
 def process_image(image_path):
     """Extract text from an image file."""
-    reader = None
-    try:
-        reader = get_ocr_reader()
+    reader = get_ocr_reader()
+    with governor.stage('ocr_image'):
         result = reader.readtext(image_path)
-        extracted_text = "\n".join([text[1] for text in result])
-        return extracted_text
-    finally:
-        # Aggressive memory cleanup
-        if reader:
-            del reader
-        gc.collect()
+    extracted_text = "\n".join([text[1] for text in result])
+    return extracted_text
 
 def process_pdf(pdf_path):
     """Extract text from a PDF file using OCR."""
@@ -33,43 +152,44 @@ def process_pdf(pdf_path):
     extracted_text = ""
     
     # First try to extract text directly if the PDF has text layers
-    doc = fitz.open(pdf_path)
-    direct_text = ""
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        direct_text += page.get_text()
-    
-    doc.close()
+    with governor.stage('pdf_text'):
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+        direct_text = ""
+        for page_num in range(page_count):
+            page = doc.load_page(page_num)
+            direct_text += page.get_text()
+        
+        doc.close()
     
     # If we got text directly, return it
     if direct_text.strip():
         return direct_text
     
     # Otherwise, convert PDF to images and use OCR
-    reader = None
+    reader = get_ocr_reader()
     try:
-        reader = get_ocr_reader()
         with tempfile.TemporaryDirectory() as temp_dir:
-            images = convert_from_path(pdf_path)
-            for i, image in enumerate(images):
-                image_path = os.path.join(temp_dir, f'page_{i}.png')
-                image.save(image_path, 'PNG')
+            # Rasterize one page at a time so only a single page image is in memory
+            for i in range(page_count):
+                with governor.stage('pdf_render'):
+                    image = convert_from_path(pdf_path, dpi=PDF_RENDER_DPI,
+                                              first_page=i + 1, last_page=i + 1)[0]
+                    image_path = os.path.join(temp_dir, f'page_{i}.png')
+                    image.save(image_path, 'PNG')
+                    image.close()
                 
                 # Process single page
-                result = reader.readtext(image_path)
+                with governor.stage('ocr_page'):
+                    result = reader.readtext(image_path)
                 page_text = "\n".join([text[1] for text in result])
                 extracted_text += f"\n--- Page {i+1} ---\n{page_text}\n"
-                
-                # Helper cleanup per page if needed, but doing it at end is usually better for speed
+                os.remove(image_path)
     except Exception as e:
         # Fallback or error if Poppler is missing
         if "poppler" in str(e).lower() or "not installed" in str(e).lower():
             raise RuntimeError("PDF OCR requires Poppler. Please install it or use images.") from e
         raise e
-    finally:
-        if reader:
-            del reader
-        gc.collect()
     
     return extracted_text
 
@@ -0,0 +1,114 @@
+"""compress ocr_result.text_content and add text_preview
+
+Revision ID: 3f2a9c1d7e4b
+Revises: 0819bdc818ce
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e4b'
+down_revision = '0819bdc818ce'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+# Frozen copies of the app's storage format at this revision, so the
+# migration does not depend on (and change with) live app code.
+_RAW = b'\x00'
+_ZLIB = b'\x01'
+_ZSTD = b'\x02'
+COMPRESSION_THRESHOLD_BYTES = 1024
+TEXT_PREVIEW_LENGTH = 100
+
+
+def make_text_preview(text):
+    if text is None:
+        return None
+    return (text[:TEXT_PREVIEW_LENGTH] + '...') if len(text) > TEXT_PREVIEW_LENGTH else text
+
+
+def compress_text(text):
+    if text is None:
+        return None
+    data = text.encode('utf-8')
+    if len(data) < COMPRESSION_THRESHOLD_BYTES:
+        return _RAW + data
+    packed = _ZLIB + zlib.compress(data, 6)
+    return packed if len(packed) < len(data) + 1 else _RAW + data
+
+
+def decompress_text(value):
+    if value is None:
+        return None
+    value = bytes(value)
+    header, payload = value[:1], value[1:]
+    if header == _ZLIB:
+        payload = zlib.decompress(payload)
+    elif header == _ZSTD:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError(
+                "Rows are zstd-compressed; install 'zstandard' to downgrade") from e
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif header != _RAW:
+        raise ValueError('Unknown compressed text header')
+    return payload.decode('utf-8')
+
+
+def _backfill(select_sql, update_sql, convert):
+    """Copy rows in id-ordered batches so large tables are not loaded at once."""
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(select_sql),
+                            {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(sa.text(update_sql),
+                     [convert(row_id, value) for row_id, value in rows])
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    with op.batch_alter_table('ocr_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('text_blob', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('text_preview', sa.String(length=103), nullable=True))
+
+    _backfill(
+        'SELECT id, text_content FROM ocr_result WHERE id > :last_id '
+        'ORDER BY id LIMIT :limit',
+        'UPDATE ocr_result SET text_blob = :blob, text_preview = :preview '
+        'WHERE id = :id',
+        lambda row_id, text: {'id': row_id,
+                              'blob': compress_text(text),
+                              'preview': make_text_preview(text)}
+    )
+
+    with op.batch_alter_table('ocr_result', schema=None) as batch_op:
+        batch_op.drop_column('text_content')
+        batch_op.alter_column('text_blob', new_column_name='text_content')
+
+
+def downgrade():
+    with op.batch_alter_table('ocr_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('text_plain', sa.Text(), nullable=True))
+
+    _backfill(
+        'SELECT id, text_content FROM ocr_result WHERE id > :last_id '
+        'ORDER BY id LIMIT :limit',
+        'UPDATE ocr_result SET text_plain = :text WHERE id = :id',
+        lambda row_id, blob: {'id': row_id, 'text': decompress_text(blob)}
+    )
+
+    with op.batch_alter_table('ocr_result', schema=None) as batch_op:
+        batch_op.drop_column('text_content')
+        batch_op.drop_column('text_preview')
+        batch_op.alter_column('text_plain', new_column_name='text_content')